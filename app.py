@@ -1,40 +1,149 @@
 import os
+
+# Opt-in green threads: must patch before httpx/threading are imported.
+# concurrent.futures then runs enrichment on greenlets (KB stacks), so the
+# fan-out can go to ~page_size instead of a handful of OS threads.
+USE_GEVENT = bool(os.environ.get("USE_GEVENT"))
+if USE_GEVENT:
+    from gevent import monkey
+    monkey.patch_all()
+
+import hashlib
+import heapq
+import operator
+import random
 import time
-import requests
-from typing import Any, Dict, List, Optional, Tuple, Union
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from flask import Flask, request, jsonify
+import threading
+import orjson
+import httpx
+from cachetools import TTLCache
+from itertools import islice
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from flask import Flask, Response, request, stream_with_context
 
 app = Flask(__name__)
 
 # Set this in Render → Environment → HIKER_API_KEY
 ACCESS_KEY = os.environ.get("HIKER_API_KEY")
+if not ACCESS_KEY:
+    # Fail the deploy at boot instead of 500-ing every request
+    raise RuntimeError("HIKER_API_KEY env var is missing")
+
+# Query params sent on every HikerAPI call; merged into per-call params in _get
+_BASE_QP = {"access_key": ACCESS_KEY}
+
+# Upper bound for the per-request `workers` knob. Enrichment is pure network
+# wait, so threads are cheap relative to the RTTs they overlap, and greenlets
+# cheaper still.
+MAX_WORKERS = 200 if USE_GEVENT else 32
+
+# Upper bound for the `pages` knob (followers pages walked per request)
+MAX_PAGES = 10
+
+# Retry policy for _get
+MAX_TRIES = 4
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+RETRY_AFTER_MAX = 30.0
+
+# AIMD limit on concurrent HikerAPI calls across all requests. Like TCP, it
+# slow-starts (+1 per clean response, i.e. doubling each round) until the first
+# throttle, then grows +1 per window of clean responses; throttling halves it
+# (plus a short cooldown). This sits on top of the per-request `workers` knob
+# and adapts to what upstream actually allows.
+CONC_MIN = 2
+CONC_MAX = 64 if not USE_GEVENT else 200
+CUR_CONC = 8
+_CONC = threading.Condition()
+_CONC_IN_FLIGHT = 0
+_CONC_OK = 0
+_CONC_SLOW_START = True
+_CONC_COOLDOWN_UNTIL = 0.0
+
+# Process-wide thread pool for enrichment and page prefetch, so requests
+# don't pay thread start-up/tear-down. Sized for a couple of concurrent
+# requests at the full per-request cap.
+EXECUTOR_WORKERS = 2 * MAX_WORKERS
+EXECUTOR = ThreadPoolExecutor(max_workers=EXECUTOR_WORKERS, thread_name_prefix="enrich")
+
+# One client shared by every request and enrichment worker. HikerAPI speaks
+# HTTP/2, so concurrent lookups multiplex as streams over a single TLS
+# connection. max_connections only bites if a server falls back to HTTP/1.1;
+# it matches the executor so workers never wait on the pool.
+# follow_redirects keeps requests' default; httpx would otherwise hand 3xx to
+# raise_for_status as an error.
+CLIENT = httpx.Client(
+    http2=True,
+    limits=httpx.Limits(max_connections=EXECUTOR_WORKERS, max_keepalive_connections=32),
+    timeout=40,
+    follow_redirects=True,
+)
+
+# Enriched rows keyed by str(pk). Follower counts drift slowly, so an hour
+# of reuse across pages/requests is worth far more than it costs in accuracy.
+# TTLCache is not thread-safe; every access goes through ENRICH_CACHE_LOCK.
+ENRICH_CACHE: TTLCache = TTLCache(maxsize=200_000, ttl=3600)
+ENRICH_CACHE_LOCK = threading.Lock()
+
+# username (lowercased) -> pk. Handles almost never move, so keep them a day.
+USER_ID_CACHE: TTLCache = TTLCache(maxsize=50_000, ttl=86400)
+USER_ID_CACHE_LOCK = threading.Lock()
+
+# Rendered /followers_enriched bodies keyed by the full query tuple (PageKey),
+# stored as (orjson bytes, etag). Matches the max-age we advertise to proxies.
+PageKey = Tuple[Any, ...]
+PAGE_CACHE_TTL = 60
+PAGE_CACHE_CONTROL = f"public, max-age={PAGE_CACHE_TTL}, stale-while-revalidate=300"
+PAGE_CACHE: TTLCache = TTLCache(maxsize=1024, ttl=PAGE_CACHE_TTL)
+PAGE_CACHE_LOCK = threading.Lock()
+
+# In-flight /followers_enriched scrapes by the same key as PAGE_CACHE; see
+# _single_flight. Followers give up after SINGLE_FLIGHT_TIMEOUT seconds.
+INFLIGHT: Dict[PageKey, Future] = {}
+INFLIGHT_LOCK = threading.Lock()
+SINGLE_FLIGHT_TIMEOUT = 150
+
+
+class SingleFlightTimeout(Exception):
+    """A _single_flight waiter gave up on the in-flight run for this key."""
 
 
-def _get(url: str, params: Optional[Dict[str, Any]] = None, tries: int = 0) -> Any:
+def _get(url: str, params: Optional[Dict[str, Any]] = None) -> Any:
     """
     GET helper that:
       - Attaches HikerAPI access_key as a query param
-      - Retries on 429/5xx with exponential backoff
+      - Retries on 429/5xx and connection errors, up to MAX_TRIES attempts
+      - Honors a numeric Retry-After, else full-jitter exponential backoff
+      - Feeds the AIMD concurrency limit (see _conc_acquire)
     Returns parsed JSON (list or dict).
     """
-    if not ACCESS_KEY:
-        raise RuntimeError("HIKER_API_KEY env var is missing")
+    qp = params | _BASE_QP if params else _BASE_QP
 
-    qp = dict(params or {})
-    qp["access_key"] = ACCESS_KEY
+    for attempt in range(MAX_TRIES):
+        last = attempt == MAX_TRIES - 1
+        _conc_acquire()
+        try:
+            r = CLIENT.get(url, params=qp)
+        except httpx.TransportError:
+            delay = _backoff(attempt)
+            _conc_decrease(delay)
+            if last:
+                raise
+            time.sleep(delay)
+            continue
+        finally:
+            _conc_release()
 
-    try:
-        r = requests.get(url, params=qp, timeout=40)
-    except requests.exceptions.RequestException as e:
-        if tries < 3:
-            time.sleep(0.5 * (2 ** tries))
-            return _get(url, params, tries + 1)
-        raise e
-
-    if r.status_code in (429, 500, 502, 503, 504) and tries < 3:
-        time.sleep(0.5 * (2 ** tries))
-        return _get(url, params, tries + 1)
+        if r.status_code in RETRY_STATUSES:
+            delay = _backoff(attempt, r.headers.get("Retry-After"))
+            _conc_decrease(delay)
+            if not last:
+                time.sleep(delay)
+                continue
+        elif r.is_success:
+            _conc_increase()
+        break
 
     r.raise_for_status()
     # Could be dict OR list (v1/chunk sometimes returns [users[], next_max_id])
@@ -45,55 +154,472 @@ def _get(url: str, params: Optional[Dict[str, Any]] = None, tries: int = 0) -> A
         raise RuntimeError(f"Non-JSON from {url}: {r.text[:200]}")
 
 
-def _normalize_followers_v1(page: Union[Dict[str, Any], List[Any]]
-                            ) -> Tuple[List[Dict[str, Any]], Optional[str], List[str]]:
+def _backoff(attempt: int, retry_after: Optional[str] = None) -> float:
+    """
+    Seconds to wait before the next attempt. A numeric Retry-After wins
+    (capped at RETRY_AFTER_MAX); otherwise full jitter over 0.5 * 2**attempt
+    so parallel workers don't retry in lockstep.
+    """
+    if retry_after:
+        try:
+            return min(max(float(retry_after), 0.0), RETRY_AFTER_MAX)
+        except ValueError:
+            # HTTP-date form; fall back to jittered backoff
+            pass
+    return random.uniform(0, 0.5 * (2 ** attempt))
+
+
+def _conc_acquire() -> None:
+    """
+    Block until an upstream slot is free under CUR_CONC and any throttle
+    cooldown has passed. Pairs with _conc_release.
+    """
+    global _CONC_IN_FLIGHT
+    with _CONC:
+        while True:
+            wait = _CONC_COOLDOWN_UNTIL - time.monotonic()
+            if wait > 0:
+                _CONC.wait(wait)
+            elif _CONC_IN_FLIGHT >= CUR_CONC:
+                _CONC.wait()
+            else:
+                break
+        _CONC_IN_FLIGHT += 1
+
+
+def _conc_release() -> None:
+    global _CONC_IN_FLIGHT
+    with _CONC:
+        _CONC_IN_FLIGHT -= 1
+        _CONC.notify()
+
+
+def _conc_increase() -> None:
+    """
+    Grow the limit after a clean response, up to CONC_MAX. In slow start
+    (before the first throttle) every clean response adds a slot, so the
+    limit doubles each round and reaches a workers=32 request within a page.
+    After that it is additive: one slot per CUR_CONC clean responses (about
+    one per round of in-flight calls, as in TCP congestion avoidance).
+    """
+    global CUR_CONC, _CONC_OK
+    with _CONC:
+        if CUR_CONC >= CONC_MAX:
+            return
+        _CONC_OK += 1
+        if _CONC_SLOW_START or _CONC_OK >= CUR_CONC:
+            CUR_CONC += 1
+            _CONC_OK = 0
+            _CONC.notify()
+
+
+def _conc_decrease(cooldown: float) -> None:
+    """
+    Multiplicative decrease on 429/5xx/transport errors: halve CUR_CONC, end
+    slow start, and hold new upstream calls for `cooldown` seconds. Signals
+    landing inside an active cooldown are the same congestion event and don't
+    halve again.
+    """
+    global CUR_CONC, _CONC_OK, _CONC_SLOW_START, _CONC_COOLDOWN_UNTIL
+    with _CONC:
+        now = time.monotonic()
+        if now >= _CONC_COOLDOWN_UNTIL:
+            CUR_CONC = max(CUR_CONC // 2, CONC_MIN)
+            _CONC_OK = 0
+            _CONC_SLOW_START = False
+        _CONC_COOLDOWN_UNTIL = max(_CONC_COOLDOWN_UNTIL, now + cooldown)
+
+
+def _normalize_followers_page(page: Union[Dict[str, Any], List[Any]]
+                              ) -> Tuple[List[Dict[str, Any]], Optional[str], List[str]]:
     """
-    Support BOTH shapes from /v1/user/followers/chunk:
-      A) list: [ users[], next_max_id_or_null ]
-      B) dict: { users: [], next_max_id: "..." }
+    Support the followers page shapes we get back:
+      A) v1 chunk list: [ users[], next_max_id_or_null ]
+      B) v1 chunk dict: { users: [], next_max_id: "..." }
+      C) v2 dict: { response: { users: [], ... }, next_page_id: "..." }
     Returns: (items, next_cursor, debug_keys)
     """
     # A) list/tuple shape
     if isinstance(page, (list, tuple)):
-        items = page[0] if len(page) > 0 and isinstance(page[0], list) else []
-        next_cursor = page[1] if len(page) > 1 else None
+        n = len(page)
+        first = page[0] if n else None
+        items = first if isinstance(first, list) else []
+        next_cursor = page[1] if n > 1 else None
         return items, (str(next_cursor) if next_cursor not in (None, "") else None), ["list_payload"]
 
-    # B) dict shape
-    items = page.get("users") or page.get("items") or page.get("results") or []
+    # B) dict shape, C) with the users nested under "response"
+    get = page.get
+    inner = get("response")
+    inner_get = inner.get if isinstance(inner, dict) else get
+    items = inner_get("users") or get("users") or get("items") or get("results") or []
     next_cursor = (
-        page.get("next_max_id")
-        or page.get("next_cursor")
-        or page.get("page_id")
-        or page.get("end_cursor")
+        get("next_page_id")
+        or get("next_max_id")
+        or get("next_cursor")
+        or get("page_id")
+        or get("end_cursor")
     )
     next_cursor = str(next_cursor) if next_cursor not in (None, "") else None
-    return items, next_cursor, list(page.keys())
+    return items, next_cursor, list(page)
 
 
 def _enrich_by_pk(pk: Union[str, int], fallback_username: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Cached wrapper around _fetch_enriched; repeat pks skip HikerAPI entirely.
+    Failures are not cached.
+    """
+    key = str(pk)
+    with ENRICH_CACHE_LOCK:
+        row = ENRICH_CACHE.get(key)
+    if row is not None:
+        return row
+    row = _fetch_enriched(pk, fallback_username)
+    with ENRICH_CACHE_LOCK:
+        ENRICH_CACHE[key] = row
+    return row
+
+
+def _fetch_enriched(pk: Union[str, int], fallback_username: Optional[str] = None) -> Dict[str, Any]:
     """
     Query /v1/user/by/id?id={pk} and return normalized row with follower count.
     """
     info = _get("https://api.hikerapi.com/v1/user/by/id", {"id": pk})
+    return _row_from_info(info, pk, fallback_username)
+
+
+def _row_from_info(info: Dict[str, Any], pk: Union[str, int],
+                   fallback_username: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Normalize a user payload (by/id response or followers page item) into a row.
+    """
+    # Runs once per follower on the worker threads; bind .get once.
+    g = info.get
     followers_cnt = (
-        info.get("followers_count")
-        or info.get("follower_count")
-        or (info.get("edge_followed_by") or {}).get("count", 0)
+        g("followers_count")
+        or g("follower_count")
+        or (g("edge_followed_by") or {}).get("count")
         or 0
     )
     return {
-        "username": info.get("username", fallback_username),
+        "username": g("username", fallback_username),
         "followers_count": int(followers_cnt),
-        "full_name": info.get("full_name", ""),
-        "pk": info.get("pk") or info.get("id") or pk,
-        "is_private": bool(info.get("is_private")),
+        "full_name": g("full_name", ""),
+        "pk": g("pk") or g("id") or pk,
+        "is_private": bool(g("is_private")),
     }
 
 
+def _page_follower_count(it: Dict[str, Any]) -> Optional[int]:
+    """
+    Follower count carried inline by a followers page item, or None if absent.
+    A present 0 counts as known, unlike the `or` chain in _row_from_info.
+    """
+    for key in ("follower_count", "followers_count"):
+        cnt = it.get(key)
+        if cnt is not None:
+            return int(cnt)
+    cnt = (it.get("edge_followed_by") or {}).get("count")
+    return int(cnt) if cnt is not None else None
+
+
+def _iter_enriched(pending: List[Tuple[Any, Optional[str]]], workers: int) -> Iterator[Dict[str, Any]]:
+    """
+    Enrich a whole page of (pk, fallback_username) pairs in one pass:
+      - Serves cache hits under a single lock acquisition
+      - Fans out only the misses to `workers` threads
+    `pending` must already hold non-empty, unique pks (_iter_page_users
+    dedupes per request). Yields rows as they become available (cache hits first, then in
+    completion order). Rows that fail to enrich are skipped.
+    """
+    hits: List[Dict[str, Any]] = []
+    misses: List[Tuple[Any, Optional[str]]] = []
+    cache_get = ENRICH_CACHE.get
+    with ENRICH_CACHE_LOCK:
+        for pk, username in pending:
+            row = cache_get(str(pk))
+            if row is not None:
+                hits.append(row)
+            else:
+                misses.append((pk, username))
+
+    yield from hits
+    if not misses:
+        return
+
+    # Sliding window on the shared pool: at most `workers` lookups in flight
+    # for this request. Each finished lookup is yielded before the window is
+    # topped up, so streamed rows go out as they land instead of after the
+    # whole page has been submitted.
+    todo = iter(misses)
+    in_flight = set()
+    while True:
+        for pk, username in islice(todo, workers - len(in_flight)):
+            in_flight.add(EXECUTOR.submit(_enrich_by_pk, pk, username))
+        if not in_flight:
+            return
+        done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+        for f in done:
+            try:
+                row = f.result()
+            except Exception:
+                # Skip one-off failures
+                continue
+            yield row
+
+
+def _json(payload: Any, status: int = 200) -> Response:
+    """
+    JSON response via orjson; several times faster than jsonify on large `users` pages.
+    """
+    return app.response_class(orjson.dumps(payload), status=status, mimetype="application/json")
+
+
+def _resolve_user_id(handle: str) -> Tuple[Any, Any]:
+    """
+    Resolve a username to its pk via /v1/user/by/username, cached for a day.
+    Returns (user_id_or_None, raw_payload); raw is None on a cache hit.
+    """
+    key = handle.lower()
+    with USER_ID_CACHE_LOCK:
+        user_id = USER_ID_CACHE.get(key)
+    if user_id is not None:
+        return user_id, None
+    u = _get("https://api.hikerapi.com/v1/user/by/username", {"username": handle})
+    user_id = u.get("pk") or u.get("id")
+    if user_id:
+        with USER_ID_CACHE_LOCK:
+            USER_ID_CACHE[key] = user_id
+    return user_id, u
+
+
+def _fetch_followers_page(user_id: Any, page_size: int, cursor: Optional[str] = None,
+                          source: str = "v1") -> Any:
+    """
+    One followers page.
+      - v1: /v1/user/followers/chunk (IMPORTANT: use 'count', not 'page_size')
+      - v2: /v2/user/followers, paged by page_id; its items usually carry
+        follower_count inline, so most rows skip the by/id lookup. HikerAPI
+        picks the page size, so page_size is ignored.
+    """
+    if source == "v2":
+        params = {"user_id": user_id}
+        if cursor:
+            params["page_id"] = cursor
+        return _get("https://api.hikerapi.com/v2/user/followers", params)
+    params = {"user_id": user_id, "count": page_size}
+    if cursor:
+        params["max_id"] = cursor
+    return _get("https://api.hikerapi.com/v1/user/followers/chunk", params)
+
+
+def _likely_above(hint: Optional[int], threshold: int) -> bool:
+    """
+    False only when the page payload proves the account is under `threshold`.
+    No hint means "maybe" so the row still gets enriched (safe default).
+    """
+    return hint is None or hint >= threshold
+
+
+def _iter_page_users(items: List[Dict[str, Any]], workers: int, min_followers: int,
+                     stats: Dict[str, Any], seen: Dict[str, int]) -> Iterator[Dict[str, Any]]:
+    """
+    Enrich one followers page and yield rows with followers_count ≥ min_followers.
+    Items whose inline follower count already decides the threshold never hit
+    by/id: below it they are dropped, at/above it the row is built locally.
+    pks already in `seen` (earlier on this page or a previous page of the same
+    request) are skipped; new ones are recorded with their position in the
+    request's page order.
+    Bumps stats["enriched_inline"] / stats["skipped_below_threshold"].
+    """
+    certain: List[Dict[str, Any]] = []
+    maybe: List[Tuple[Any, Optional[str]]] = []
+    skipped = 0
+    for it in items:
+        pk = it.get("pk") or it.get("id")
+        if not pk:
+            continue
+        key = str(pk)
+        if key in seen:
+            continue
+        seen[key] = len(seen)
+        hint = _page_follower_count(it)
+        if not _likely_above(hint, min_followers):
+            skipped += 1
+        elif hint is not None:
+            certain.append(_row_from_info(it, pk))
+        else:
+            maybe.append((pk, it.get("username")))
+    stats["enriched_inline"] += len(certain)
+    stats["skipped_below_threshold"] += skipped
+
+    yield from certain
+    for row in _iter_enriched(maybe, workers):
+        if row["followers_count"] >= min_followers:
+            yield row
+
+
+def _iter_followers(user_id: Any, page_size: int, min_followers: int, cursor: Optional[str],
+                    workers: int, pages: int, stats: Dict[str, Any],
+                    source: str = "v1") -> Iterator[Dict[str, Any]]:
+    """
+    Walk up to `pages` followers pages from `source` (see _fetch_followers_page),
+    yielding qualifying rows.
+    The next cursor's page is fetched while the current one is being enriched.
+    Fills `stats` with next_cursor, the debug counters and page_order
+    (str(pk) -> position across the walked pages) as it goes.
+    """
+    stats.update(next_cursor=None, followers_page_keys=None, received_type=None,
+                 enriched_inline=0, skipped_below_threshold=0, pages_fetched=0, page_order={})
+    page = _fetch_followers_page(user_id, page_size, cursor, source)
+    stats["received_type"] = type(page).__name__
+    seen: Dict[str, int] = stats["page_order"]
+    while True:
+        items, next_cursor, page_keys = _normalize_followers_page(page)
+        if stats["pages_fetched"] == 0:
+            stats["followers_page_keys"] = page_keys
+        stats["pages_fetched"] += 1
+        stats["next_cursor"] = next_cursor
+        nxt = None
+        if next_cursor and stats["pages_fetched"] < pages:
+            nxt = EXECUTOR.submit(_fetch_followers_page, user_id, page_size, next_cursor, source)
+
+        yield from _iter_page_users(items, workers, min_followers, stats, seen)
+
+        if nxt is None:
+            return
+        page = nxt.result()
+
+
+def _stream_ndjson(account_label: Any, user_id: Any, page_size: int, min_followers: int,
+                   cursor: Optional[str], workers: int, pages: int,
+                   source: str = "v1") -> Iterator[bytes]:
+    """
+    NDJSON body for format=ndjson: a header line, one line per qualifying
+    user as soon as it resolves, then a trailer with returned/next_cursor.
+    Errors after the first byte can't change the status, so they are sent
+    as a final {"error": ...} line instead of the trailer.
+    """
+    yield orjson.dumps({"account_scraped": account_label}) + b"\n"
+    stats: Dict[str, Any] = {}
+    returned = 0
+    try:
+        for row in _iter_followers(user_id, page_size, min_followers, cursor, workers, pages, stats, source):
+            returned += 1
+            yield orjson.dumps(row) + b"\n"
+    except httpx.HTTPStatusError as e:
+        yield orjson.dumps({"error": "HikerAPI HTTPError", "detail": str(e)}) + b"\n"
+        return
+    except Exception as e:
+        yield orjson.dumps({"error": "Server exception", "detail": str(e)}) + b"\n"
+        return
+    yield orjson.dumps({"returned": returned, "next_cursor": stats["next_cursor"]}) + b"\n"
+
+
 @app.get("/health")
 def health():
-    return jsonify(ok=True)
+    return _json({"ok": True})
+
+
+_by_followers = operator.itemgetter("followers_count")
+
+
+def _build_followers_page(handle: Optional[str], user_id: Optional[str], page_size: int,
+                          min_followers: int, cursor: Optional[str], workers: int,
+                          pages: int, include_debug: bool, sort_by_followers: bool = False,
+                          top: int = 0, source: str = "v1") -> Tuple[Dict[str, Any], int]:
+    """
+    Do the actual scrape for /followers_enriched.
+    Returns (payload, http_status); upstream errors propagate as exceptions.
+    """
+    # 1) Resolve user id if only username given (cached per handle)
+    account_label = handle or user_id
+    if not user_id:
+        user_id, u = _resolve_user_id(handle)
+        if not user_id:
+            return {"error": "Could not resolve user id from username", "username": handle, "raw": u}, 400
+
+    # 2) Fetch followers pages and 3) enrich/filter ≥ min_followers
+    stats: Dict[str, Any] = {}
+    users = list(_iter_followers(user_id, page_size, min_followers, cursor, workers, pages, stats, source))
+    # Rows arrive in completion order; put them back in page order so the
+    # same follower data always encodes to the same bytes (and ETag).
+    # sort/top below are stable, so ties keep this order too.
+    pos = stats["page_order"]
+    users.sort(key=lambda row: pos.get(str(row["pk"]), len(pos)))
+    if top > 0:
+        # O(n log k) partial sort; already descending
+        users = heapq.nlargest(top, users, key=_by_followers)
+    elif sort_by_followers:
+        users.sort(key=_by_followers, reverse=True)
+
+    resp = {
+        "account_scraped": account_label,
+        "returned": len(users),
+        "next_cursor": stats["next_cursor"],
+        "users": users,
+    }
+    if include_debug:
+        resp["debug"] = {
+            "followers_page_keys": stats["followers_page_keys"],
+            "received_type": stats["received_type"],
+            "page_size_requested": page_size,
+            "source": source,
+            "workers": workers,
+            "enriched_inline": stats["enriched_inline"],
+            "skipped_below_threshold": stats["skipped_below_threshold"],
+            "pages_fetched": stats["pages_fetched"],
+        }
+    return resp, 200
+
+
+def _render_page(key: PageKey, *args: Any) -> Tuple[int, Any]:
+    """
+    Run _build_followers_page(*args) and, on success, store the encoded body
+    in PAGE_CACHE under `key`.
+    Returns (200, (body, etag)) or (status, error_payload).
+    """
+    payload, status = _build_followers_page(*args)
+    if status != 200:
+        return status, payload
+    body = orjson.dumps(payload)
+    hit = (body, hashlib.blake2b(body, digest_size=16).hexdigest())
+    with PAGE_CACHE_LOCK:
+        PAGE_CACHE[key] = hit
+    return status, hit
+
+
+def _single_flight(key: PageKey, fn: Callable[[], Any]) -> Any:
+    """
+    Run fn() at most once at a time per key. Callers arriving while a run is
+    in flight wait for its result (or exception) instead of repeating it;
+    a waiter that gives up after SINGLE_FLIGHT_TIMEOUT raises SingleFlightTimeout.
+    fn should publish its result somewhere durable (PAGE_CACHE) before
+    returning, since the in-flight entry is dropped as soon as it finishes.
+    """
+    with INFLIGHT_LOCK:
+        fut = INFLIGHT.get(key)
+        leader = fut is None
+        if leader:
+            fut = INFLIGHT[key] = Future()
+    if not leader:
+        try:
+            return fut.result(timeout=SINGLE_FLIGHT_TIMEOUT)
+        except FuturesTimeoutError:
+            # Re-raise as our own type so the view can tell this apart from
+            # other TimeoutErrors (FuturesTimeoutError is builtin TimeoutError on 3.11+)
+            raise SingleFlightTimeout(key) from None
+
+    try:
+        result = fn()
+    except BaseException as e:
+        fut.set_exception(e)
+        raise
+    else:
+        fut.set_result(result)
+        return result
+    finally:
+        with INFLIGHT_LOCK:
+            INFLIGHT.pop(key, None)
 
 
 @app.get("/followers_enriched")
@@ -106,9 +632,18 @@ def followers_enriched():
       - username OR user_id
       - page_size (default 200)
       - min_followers (default 10000)
-      - workers (1..8, default 5)
+      - workers (1..MAX_WORKERS, default 5)
       - cursor (pass previous next_cursor)
-      - debug=1 to include debug info
+      - pages (1..MAX_PAGES, default 1) to walk several cursors in one call
+      - source=v2 to page via /v2/user/followers (inline follower_count) instead of v1 chunk
+      - sort=followers to order users by followers_count, highest first (JSON only)
+      - top=K to keep only the K largest accounts, highest first (JSON only)
+      - debug=1 to include debug info (JSON only)
+      - format=ndjson to stream users as they resolve (see _stream_ndjson)
+
+    Successful pages are cached in-process for PAGE_CACHE_TTL seconds and
+    carry an ETag + Cache-Control, so repeat polls (and If-None-Match
+    revalidations) are answered without touching HikerAPI.
     """
     try:
         handle = request.args.get("username")
@@ -116,68 +651,70 @@ def followers_enriched():
         page_size = int(request.args.get("page_size", 200))
         min_followers = int(request.args.get("min_followers", 10000))
         cursor = request.args.get("cursor")
-        workers = max(1, min(int(request.args.get("workers", 5)), 4))  # cap to 4
+        workers = max(1, min(int(request.args.get("workers", 5)), MAX_WORKERS))
+        pages = max(1, min(int(request.args.get("pages", 1)), MAX_PAGES))
+        source = "v2" if request.args.get("source") == "v2" else "v1"
         include_debug = request.args.get("debug") == "1"
+        sort_by_followers = request.args.get("sort") == "followers"
+        top = max(0, int(request.args.get("top", 0)))
 
-        # 1) Resolve user id if only username given
-        account_label = handle or user_id
-        if not user_id:
-            if not handle:
-                return jsonify(error="Provide 'username' or 'user_id'"), 400
-            u = _get("https://api.hikerapi.com/v1/user/by/username", {"username": handle})
-            user_id = u.get("pk") or u.get("id")
+        if not user_id and not handle:
+            return _json({"error": "Provide 'username' or 'user_id'"}, 400)
+
+        if request.args.get("format") == "ndjson":
+            # Streamed rows bypass PAGE_CACHE / single-flight: they're sent
+            # as they resolve rather than rendered as one body.
+            account_label = handle or user_id
             if not user_id:
-                return jsonify(error="Could not resolve user id from username", username=handle, raw=u), 400
+                user_id, u = _resolve_user_id(handle)
+                if not user_id:
+                    return _json({"error": "Could not resolve user id from username", "username": handle, "raw": u}, 400)
+            return Response(stream_with_context(_stream_ndjson(
+                account_label, user_id, page_size, min_followers, cursor, workers, pages, source)),
+                mimetype="application/x-ndjson")
 
-        # 2) Fetch a followers page via v1 chunk (IMPORTANT: use 'count', not 'page_size')
-        params = {"user_id": user_id, "count": page_size}
-        if cursor:
-            params["max_id"] = cursor
-        page = _get("https://api.hikerapi.com/v1/user/followers/chunk", params)
-
-        items, next_cursor, follower_page_keys = _normalize_followers_v1(page)
-
-        # 3) Enrich in parallel and filter ≥ min_followers
-        users: List[Dict[str, Any]] = []
-        with ThreadPoolExecutor(max_workers=workers) as ex:
-            futs = []
-            for it in items:
-                pk = it.get("pk") or it.get("id")
-                if not pk:
-                    continue
-                futs.append(ex.submit(_enrich_by_pk, pk, it.get("username")))
-            for f in as_completed(futs):
-                try:
-                    row = f.result()
-                    if row["followers_count"] >= min_followers:
-                        users.append(row)
-                except Exception:
-                    # Skip one-off failures
-                    pass
-
-        resp = {
-            "account_scraped": account_label,
-            "returned": len(users),
-            "next_cursor": next_cursor,
-            "users": users,
-        }
+        # Everything that changes the body; workers only shows up in debug.
+        # Kept as a tuple: joining raw query strings lets e.g. user_id=1| and
+        # cursor=| collide on one cache/in-flight entry.
+        key = (handle, user_id, cursor, page_size, min_followers, pages, source,
+               sort_by_followers, top, workers if include_debug else None)
+        with PAGE_CACHE_LOCK:
+            hit = PAGE_CACHE.get(key)
+        if hit is None:
+            # Identical concurrent polls share one scrape instead of each fanning out
+            status, hit = _single_flight(key, lambda: _render_page(
+                key, handle, user_id, page_size, min_followers, cursor, workers, pages, include_debug,
+                sort_by_followers, top, source))
+            if status != 200:
+                return _json(hit, status)
+        body, etag = hit
+
+        # If-None-Match uses weak comparison (RFC 9110 §13.1.2): edges that
+        # compress the body rewrite our tag to W/"...", which must still match
+        if request.if_none_match.contains_weak(etag):
+            resp = app.response_class(status=304)
+        else:
+            resp = app.response_class(body, mimetype="application/json")
+        resp.set_etag(etag)
+        resp.headers["Cache-Control"] = PAGE_CACHE_CONTROL
         if include_debug:
-            resp["debug"] = {
-                "followers_page_keys": follower_page_keys,
-                "received_type": type(page).__name__,
-                "page_size_requested": page_size,
-                "workers": workers,
-            }
-        return jsonify(resp)
-
-    except requests.HTTPError as e:
+            # Live value; the cached body may be up to PAGE_CACHE_TTL old
+            resp.headers["X-Upstream-Concurrency"] = str(CUR_CONC)
+        return resp
+
+    except httpx.HTTPStatusError as e:
         # Surface upstream error to your browser and Render logs
-        return jsonify(error="HikerAPI HTTPError", detail=str(e)), 502
+        return _json({"error": "HikerAPI HTTPError", "detail": str(e)}, 502)
+    except SingleFlightTimeout:
+        # An identical request is still scraping; the client can just retry
+        return _json({"error": "Timed out waiting for in-flight scrape",
+                      "detail": f"no result after {SINGLE_FLIGHT_TIMEOUT}s"}, 504)
     except Exception as e:
         # Show Python exception text so you can see what's wrong
-        return jsonify(error="Server exception", detail=str(e)), 500
+        return _json({"error": "Server exception", "detail": str(e)}, 500)
 
 
+# Local dev only; production runs under gunicorn (see Procfile)
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", "3000"))
     app.run(host="0.0.0.0", port=port)